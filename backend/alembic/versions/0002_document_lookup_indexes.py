@@ -0,0 +1,27 @@
+"""document lookup indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-14 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_doc_owner_id', 'documents', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_chunk_docid_idx', 'document_chunks', ['document_id', 'chunk_index'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunk_docid_idx', table_name='document_chunks')
+    op.drop_index('ix_doc_owner_id', table_name='documents')
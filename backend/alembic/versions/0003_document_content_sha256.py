@@ -0,0 +1,28 @@
+"""document content sha256
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-14 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.create_index('ix_doc_owner_sha256', 'documents', ['owner_id', 'content_sha256'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_doc_owner_sha256', table_name='documents')
+    op.drop_column('documents', 'content_sha256')
@@ -0,0 +1,35 @@
+"""chunk embedding hnsw index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-14 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # HNSW needs pgvector >= 0.5.0 on the server
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.create_index(
+        'ix_chunk_embedding_hnsw',
+        'document_chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunk_embedding_hnsw', table_name='document_chunks')
@@ -0,0 +1,52 @@
+"""store chunk embeddings as halfvec
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-14 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # halfvec needs pgvector >= 0.7.0 on the server
+    op.drop_index('ix_chunk_embedding_hnsw', table_name='document_chunks')
+    op.execute(
+        "ALTER TABLE document_chunks "
+        "ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536)"
+    )
+    op.create_index(
+        'ix_chunk_embedding_hnsw',
+        'document_chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'halfvec_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunk_embedding_hnsw', table_name='document_chunks')
+    op.execute(
+        "ALTER TABLE document_chunks "
+        "ALTER COLUMN embedding TYPE vector(1536) USING embedding::vector(1536)"
+    )
+    op.create_index(
+        'ix_chunk_embedding_hnsw',
+        'document_chunks',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
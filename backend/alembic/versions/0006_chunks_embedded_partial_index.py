@@ -0,0 +1,32 @@
+"""partial index on embedded chunks
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-14 09:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_chunks_embedded_doc_id',
+        'document_chunks',
+        ['document_id'],
+        unique=False,
+        postgresql_where=sa.text('embedding IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunks_embedded_doc_id', table_name='document_chunks')
@@ -0,0 +1,32 @@
+"""partial index on chunks missing embeddings
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-14 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_chunks_missing_emb',
+        'document_chunks',
+        ['document_id'],
+        unique=False,
+        postgresql_where=sa.text('embedding IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunks_missing_emb', table_name='document_chunks')
@@ -1,20 +1,27 @@
 from datetime import timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
+import anyio
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, EmailStr, Field
 from app.database import get_db
 from app.models import User
-from app.utils.security import verify_password, get_password_hash, create_access_token, verify_token
+from app.utils.security import verify_and_update_password, get_password_hash, create_access_token, verify_token
+from app.utils.user_cache import get_cached_user, cache_user
 
 # Security scheme for extracting Bearer tokens
 security = HTTPBearer()
 
+# Hot lookup built once at import so every request reuses the cached compiled form
+GET_USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+
 # Pydantic schemas for request/response validation
 class UserCreate(BaseModel):
     email: EmailStr
-    password: str
+    # Validated before hashing so bad signups never pay for the KDF
+    password: str = Field(min_length=8, max_length=128)
     full_name: Optional[str] = None
 
 class UserLogin(BaseModel):
@@ -35,10 +42,22 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True  # Allows SQLAlchemy model conversion
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+class CurrentUser(NamedTuple):
+    """Detached snapshot of the authenticated user, safe to cache across requests"""
+    id: int
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+    is_admin: bool
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """
     Authenticate user with email and password.
     
+    Password verification runs in a worker thread so the CPU-heavy hash
+    doesn't block the event loop. Hashes using a deprecated scheme (e.g.
+    legacy bcrypt) are upgraded in place on successful login.
+    
     Args:
         db: Database session
         email: User email
@@ -47,15 +66,23 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     Returns:
         User object if authentication successful, None otherwise
     """
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(GET_USER_BY_EMAIL, {"email": email})
+    user = result.scalar_one_or_none()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await anyio.to_thread.run_sync(
+        verify_and_update_password, password, user.hashed_password
+    )
+    if not valid:
         return None
+    
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
         
     return user
 
-def create_user(db: Session, user_data: UserCreate) -> User:
+async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
     """
     Create a new user with hashed password.
     
@@ -70,38 +97,43 @@ def create_user(db: Session, user_data: UserCreate) -> User:
         HTTPException: If email already exists
     """
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    result = await db.execute(GET_USER_BY_EMAIL, {"email": user_data.email})
+    existing_user = result.scalar_one_or_none()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create new user with hashed password
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user with hashed password (hashed off the event loop)
+    hashed_password = await anyio.to_thread.run_sync(get_password_hash, user_data.password)
     db_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
         full_name=user_data.full_name
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_db)
+) -> CurrentUser:
     """
     FastAPI dependency to get current authenticated user.
     
+    Token verification is cached briefly in verify_token, and a recently
+    seen user is served from the user cache, so repeated requests skip both
+    signature verification and the users lookup.
+    
     Args:
         credentials: Bearer token from request header
         db: Database session
         
     Returns:
-        Current user object
+        Current user snapshot
         
     Raises:
         HTTPException: If token is invalid or user not found
@@ -114,18 +146,29 @@ def get_current_user(
     
     # Verify token and extract email
     email = verify_token(credentials.credentials)
-    if email is None:
-        raise credentials_exception
     
-    # Get user from database
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
+    current_user = get_cached_user(email) if email is not None else None
+    if current_user is None:
+        # Get user from database. The lookup runs even for an invalid token
+        # so a bad token and an unknown user cost the same round-trip.
+        result = await db.execute(GET_USER_BY_EMAIL, {"email": email or ""})
+        user = result.scalar_one_or_none()
+        if email is None or user is None:
+            raise credentials_exception
+        
+        current_user = CurrentUser(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=user.is_active,
+            is_admin=user.is_admin
+        )
+        cache_user(email, current_user)
     
-    return user
+    return current_user
 
 
-def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+def get_admin_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """
     FastAPI dependency to ensure current user is an admin.
     
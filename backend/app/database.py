@@ -1,30 +1,42 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 from app.config import settings
 
+# Async driver URL; DATABASE_URL stays a plain postgresql:// URL so
+# sync tooling can keep using psycopg2
+async_database_url = settings.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
 # Create database engine
 # pool_pre_ping=True helps with connection drops
-engine = create_engine(
-    settings.database_url,
+# Pool limits come from settings (DB_POOL_SIZE etc.) so each deployment can
+# size them for its concurrency; the SQLAlchemy default 5+10 queues up and
+# times out well before 100 concurrent requests. When running several
+# workers, front Postgres with PgBouncer (transaction pooling) and point
+# DATABASE_URL at it so total server connections stay bounded.
+engine = create_async_engine(
+    async_database_url,
     pool_pre_ping=True,
-    echo=settings.app_env == "development"  # Log SQL queries in dev
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,  # Recycle connections before server/proxy idle timeouts drop them
+    query_cache_size=1200,  # Compiled-statement cache; asyncpg also caches prepared statements per connection
+    echo=settings.sqlalchemy_echo  # Dev only: SQL logging serializes every query on the log handler
 )
 
 # Session factory for database operations
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False so attributes stay readable after commit without
+# triggering implicit (and, under asyncio, illegal) lazy loads
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 # Base class for all ORM models
 Base = declarative_base()
 
 # Dependency to get database session in FastAPI routes
-def get_db():
+async def get_db():
     """
     Database session dependency for FastAPI.
     Ensures sessions are properly closed after each request.
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
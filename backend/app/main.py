@@ -1,16 +1,33 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import settings
-from app.database import engine
-import app.models  # Import the models module
-
-# Create database tables
-app.models.Base.metadata.create_all(bind=engine)
+from fastapi.responses import ORJSONResponse
+from app.config import Settings, get_settings, settings
+from app.database import Base, engine
+from app.services.pdf_processing import shutdown_process_pool
+from sqlalchemy import text
+import app.models  # Import the models module so tables register on Base
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.app_env == "development":
+        # Dev convenience only; other environments are migrated with Alembic
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        # Open the first pooled connection before traffic arrives
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    yield
+    shutdown_process_pool()
+    await engine.dispose()
 
 app = FastAPI(
     title="GenAI Research Assistant",
     description="A RAG-powered AI research assistant",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson encodes lists/datetimes far faster than stdlib json
 )
 
 # CORS middleware for frontend communication
@@ -27,11 +44,11 @@ async def root():
     return {"message": "GenAI Research Assistant API", "status": "running"}
 
 @app.get("/health")
-async def health_check():
+async def health_check(app_settings: Settings = Depends(get_settings)):
     return {
         "status": "healthy",
-        "environment": settings.app_env,
-        "openai_configured": bool(settings.openai_api_key)
+        "environment": app_settings.app_env,
+        "openai_configured": bool(app_settings.openai_api_key)
     }
 
 # Include authentication routes
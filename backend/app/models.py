@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
-from pgvector.sqlalchemy import Vector
+from sqlalchemy.sql import func, text
+from pgvector.sqlalchemy import HALFVEC
 from app.database import Base
 
 class User(Base):
@@ -32,7 +32,9 @@ class Document(Base):
     content_type = Column(String(100), nullable=False)
     status = Column(String(50), default="processing")  # processing, completed, failed
     upload_path = Column(String(500), nullable=True)
+    content_sha256 = Column(String(64), nullable=True)  # Hex digest of file content, for dedup
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())  # Last status change, for stuck-record recovery
     
     # Foreign keys
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -40,6 +42,13 @@ class Document(Base):
     # Relationships
     owner = relationship("User", back_populates="documents")
     chunks = relationship("DocumentChunk", back_populates="document")
+    
+    __table_args__ = (
+        # Serves the per-request (id, owner_id) ownership checks
+        Index("ix_doc_owner_id", "owner_id", "id"),
+        # One copy of each file per user
+        Index("ix_doc_owner_sha256", "owner_id", "content_sha256", unique=True),
+    )
 
 class DocumentChunk(Base):
     """Stores text chunks from documents with their embeddings"""
@@ -51,7 +60,9 @@ class DocumentChunk(Base):
     page_number = Column(Integer, nullable=True)
     
     # Vector embedding (1536 dimensions for OpenAI text-embedding-3-small)
-    embedding = Column(Vector(1536), nullable=True)
+    # Stored as half precision: half the storage and scan bandwidth of vector,
+    # with no practical loss for cosine retrieval
+    embedding = Column(HALFVEC(1536), nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -60,6 +71,31 @@ class DocumentChunk(Base):
     
     # Relationships
     document = relationship("Document", back_populates="chunks")
+    
+    __table_args__ = (
+        # Serves document-scoped lookups ordered by chunk position
+        Index("ix_chunk_docid_idx", "document_id", "chunk_index"),
+        # Small partial index of embedded rows, for coverage stats and resets
+        Index(
+            "ix_chunks_embedded_doc_id",
+            "document_id",
+            postgresql_where=text("embedding IS NOT NULL"),
+        ),
+        # Partial index of rows still waiting for an embedding
+        Index(
+            "ix_chunks_missing_emb",
+            "document_id",
+            postgresql_where=text("embedding IS NULL"),
+        ),
+        # Approximate nearest-neighbour index for cosine similarity search
+        Index(
+            "ix_chunk_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "halfvec_cosine_ops"},
+        ),
+    )
 
 class ChatSession(Base):
     """Stores chat conversations for each user"""
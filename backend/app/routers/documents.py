@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile, File
+from sqlalchemy import and_, func, or_, select, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-import os
+from datetime import datetime, timedelta, timezone
+import hashlib
 import uuid
 from pathlib import Path
+import aiofiles
+import aiofiles.os
 
 from app.database import get_db
-from app.auth import get_current_user
-from app.models import User, Document
-from app.services.document_processor import process_uploaded_document, get_document_stats
+from app.auth import CurrentUser, get_current_user
+from app.models import Document, DocumentChunk
+from app.services.document_processor import process_document_in_background
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/documents", tags=["documents"])
@@ -19,7 +24,7 @@ class DocumentResponse(BaseModel):
     original_filename: str
     file_size: int
     status: str
-    created_at: str
+    created_at: datetime  # Serialized to ISO 8601 by the response encoder
     class Config:
         from_attributes = True
 
@@ -29,76 +34,160 @@ class DocumentListResponse(BaseModel):
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
-ALLOWED_EXTENSIONS = {".pdf"}
+ALLOWED_EXTENSIONS = frozenset({".pdf"})
 MAX_FILE_SIZE = 10 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Background processing isn't durable: a record left "uploaded" or
+# "processing" this long after its last change is assumed abandoned, and a
+# re-upload of the same file retries it
+STALE_PROCESSING_AFTER = timedelta(minutes=30)
 
-def validate_pdf_file(file: UploadFile) -> None:
+def validate_pdf_file(file: UploadFile) -> str:
+    """Validate an uploaded PDF and return its normalized file extension"""
     file_extension = Path(file.filename).suffix.lower()
     if file_extension not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Only PDF files allowed")
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Invalid file type")
+    return file_extension
 
 @router.post("/upload", response_model=DocumentResponse)
-async def upload_document(file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    validate_pdf_file(file)
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
+async def upload_document(background_tasks: BackgroundTasks, file: UploadFile = File(...), current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    file_extension = validate_pdf_file(file)
+    # The multipart parser has already counted the bytes; reject before touching disk
+    if file.size is not None and file.size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="File too large")
     
     file_id = str(uuid.uuid4())
-    unique_filename = f"{file_id}{Path(file.filename).suffix}"
+    unique_filename = f"{file_id}{file_extension}"
     file_path = UPLOAD_DIR / unique_filename
     
-    with open(file_path, "wb") as f:
-        f.write(file_content)
+    # Stream to disk in bounded chunks; the upload is never held in memory whole.
+    # The streamed byte count is what gets recorded as file_size.
+    file_size = 0
+    content_hash = hashlib.sha256()
+    async with aiofiles.open(file_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > MAX_FILE_SIZE:
+                break
+            content_hash.update(chunk)
+            await f.write(chunk)
     
-    db_document = Document(
-        filename=unique_filename, original_filename=file.filename,
-        file_size=len(file_content), content_type=file.content_type,
-        status="uploaded", upload_path=str(file_path), owner_id=current_user.id
-    )
-    db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
+    if file_size > MAX_FILE_SIZE:
+        await aiofiles.os.remove(file_path)
+        raise HTTPException(status_code=400, detail="File too large")
     
-    return DocumentResponse(
-        id=db_document.id, filename=db_document.filename,
-        original_filename=db_document.original_filename,
-        file_size=db_document.file_size, status=db_document.status,
-        created_at=db_document.created_at.isoformat()
+    # Re-uploads of the same file by the same user reuse the existing record,
+    # which skips the expensive parse/embed pipeline. A record whose earlier
+    # processing failed, or was abandoned (see STALE_PROCESSING_AFTER), is
+    # retried with the fresh copy instead.
+    content_sha256 = content_hash.hexdigest()
+    existing_stmt = select(Document).where(
+        Document.owner_id == current_user.id,
+        Document.content_sha256 == content_sha256
     )
+    db_document = (await db.execute(existing_stmt)).scalar_one_or_none()
+    
+    if db_document is not None and db_document.status != "completed":
+        previous_path = db_document.upload_path
+        stale_before = datetime.now(timezone.utc) - STALE_PROCESSING_AFTER
+        # Conditional on the status so concurrent re-uploads retry it only once
+        result = await db.execute(
+            update(Document)
+            .where(
+                Document.id == db_document.id,
+                or_(
+                    Document.status == "failed",
+                    and_(
+                        Document.status.in_(("uploaded", "processing")),
+                        func.coalesce(Document.updated_at, Document.created_at) < stale_before
+                    )
+                )
+            )
+            .values(status="uploaded", filename=unique_filename, upload_path=str(file_path), file_size=file_size)
+        )
+        await db.commit()
+        if result.rowcount:
+            background_tasks.add_task(process_document_in_background, db_document.id)
+            stale_path = previous_path
+        else:
+            # Still in progress, or another re-upload already claimed the retry
+            stale_path = str(file_path)
+        if stale_path and await aiofiles.os.path.exists(stale_path):
+            await aiofiles.os.remove(stale_path)
+        await db.refresh(db_document)
+    elif db_document is not None:
+        await aiofiles.os.remove(file_path)
+    else:
+        db_document = Document(
+            filename=unique_filename, original_filename=file.filename,
+            file_size=file_size, content_type=file.content_type,
+            status="uploaded", upload_path=str(file_path), owner_id=current_user.id,
+            content_sha256=content_sha256
+        )
+        db.add(db_document)
+        try:
+            await db.commit()
+            await db.refresh(db_document)
+            # Extract and chunk after the response is sent instead of on a second request
+            background_tasks.add_task(process_document_in_background, db_document.id)
+        except IntegrityError:
+            # A concurrent upload of the same file was committed first
+            await db.rollback()
+            await aiofiles.os.remove(file_path)
+            db_document = (await db.execute(existing_stmt)).scalar_one()
+    
+    return DocumentResponse.model_validate(db_document)
 
 @router.get("/", response_model=DocumentListResponse)
-async def list_documents(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def list_documents(current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # Select only the columns DocumentResponse needs; plain rows skip ORM hydration
+    stmt = select(
+        Document.id, Document.filename, Document.original_filename,
+        Document.file_size, Document.status, Document.created_at
+    )
     if current_user.is_admin:
-        documents = db.query(Document).all()
+        # Unfiltered listing can be large, so stream it from a server-side cursor
+        result = await db.stream(stmt.execution_options(yield_per=500))
+        documents = [doc async for doc in result]
     else:
-        documents = db.query(Document).filter(Document.owner_id == current_user.id).all()
+        stmt = stmt.where(Document.owner_id == current_user.id)
+        documents = (await db.execute(stmt)).all()
     
-    return DocumentListResponse(
-        documents=[DocumentResponse(
-            id=doc.id, filename=doc.filename, original_filename=doc.original_filename,
-            file_size=doc.file_size, status=doc.status, created_at=doc.created_at.isoformat()
-        ) for doc in documents],
-        total_count=len(documents)
-    )
+    # Rows are validated straight into DocumentResponse via from_attributes
+    return DocumentListResponse(documents=documents, total_count=len(documents))
 
-@router.get("/{document_id}/chunks")
-async def get_document_chunks(document_id: int, limit: int = 10, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    if current_user.is_admin:
-        document = db.query(Document).filter(Document.id == document_id).first()
-    else:
-        document = db.query(Document).filter(Document.id == document_id, Document.owner_id == current_user.id).first()
+@router.get("/{document_id}/chunks", response_model=None)  # Debug endpoint; skip response validation
+async def get_document_chunks(document_id: int, limit: int = Query(10, ge=0), current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # Access check and chunk fetch in one round-trip. The limit applies to the
+    # chunk subquery only, and the outer join keeps a row for an accessible
+    # document even when no chunks come back (none yet, or limit=0).
+    limited_chunks = (
+        select(DocumentChunk.chunk_index, func.substr(DocumentChunk.chunk_text, 1, 200).label("text"))
+        .where(DocumentChunk.document_id == document_id)
+        .order_by(DocumentChunk.chunk_index)
+        .limit(limit)
+        .subquery()
+    )
+    stmt = (
+        select(limited_chunks.c.chunk_index, limited_chunks.c.text)
+        .select_from(Document)
+        .outerjoin(limited_chunks, true())
+        .where(Document.id == document_id)
+        .order_by(limited_chunks.c.chunk_index)
+    )
+    if not current_user.is_admin:
+        stmt = stmt.where(Document.owner_id == current_user.id)
+    rows = (await db.execute(stmt)).all()
     
-    if not document:
+    if not rows:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    from app.models import DocumentChunk
-    chunks = db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).order_by(DocumentChunk.chunk_index).limit(limit).all()
+    chunks = [row for row in rows if row.chunk_index is not None]
     
     return {
         "document_id": document_id,
         "total_chunks": len(chunks),
-        "chunks": [{"index": chunk.chunk_index, "text": chunk.chunk_text[:200]} for chunk in chunks]
+        "chunks": [{"index": chunk.chunk_index, "text": chunk.text} for chunk in chunks]
     }
\ No newline at end of file
@@ -1,14 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+import time
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import and_, bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.auth import get_current_user
-from app.models import User
-from app.services.embeddings import embedding_service
-from pydantic import BaseModel
-from typing import Optional
+from app.auth import CurrentUser, get_current_user
+from app.config import settings
+from app.models import Document, DocumentChunk
+from app.services.embeddings import embedding_service, is_skipped
+from pydantic import BaseModel, conlist, constr
+from typing import List, Optional
 
 router = APIRouter(prefix="/embeddings", tags=["embeddings"])
 
+# Statements built once at import so every request reuses the cached compiled form.
+# Each folds the access check into the query doing the work: the owned
+# variants add the owner filter, and no row back means "not found".
+
+# Document status plus its chunks still missing embeddings, in one round-trip
+GET_DOCUMENT_PENDING_CHUNKS = (
+    select(Document.status, Document.original_filename, DocumentChunk.id, DocumentChunk.chunk_text)
+    .select_from(Document)
+    .outerjoin(
+        DocumentChunk,
+        and_(DocumentChunk.document_id == Document.id, DocumentChunk.embedding.is_(None))
+    )
+    .where(Document.id == bindparam("document_id"))
+)
+GET_OWNED_DOCUMENT_PENDING_CHUNKS = GET_DOCUMENT_PENDING_CHUNKS.where(Document.owner_id == bindparam("owner_id"))
+
+def _reset_embeddings_statement(owned: bool):
+    """
+    Build the single-statement reset: the document lookup, the UPDATE ...
+    RETURNING and the count run as CTEs of one SELECT (PostgreSQL).
+    """
+    # Bind names must not match document_chunks columns: SQLAlchemy reserves
+    # those for the UPDATE's SET clause
+    document = select(Document.id, Document.original_filename).where(Document.id == bindparam("b_document_id"))
+    if owned:
+        document = document.where(Document.owner_id == bindparam("b_owner_id"))
+    document = document.cte("document")
+    
+    # Only still-embedded rows are touched (served by the partial index)
+    reset = (
+        update(DocumentChunk)
+        .where(
+            DocumentChunk.document_id.in_(select(document.c.id)),
+            DocumentChunk.embedding.isnot(None)
+        )
+        .values(embedding=None)
+        .returning(DocumentChunk.id)
+        .cte("reset")
+    )
+    return select(
+        document.c.original_filename,
+        select(func.count()).select_from(reset).scalar_subquery().label("chunks_updated")
+    )
+
+RESET_DOCUMENT_EMBEDDINGS = _reset_embeddings_statement(owned=False)
+RESET_OWNED_DOCUMENT_EMBEDDINGS = _reset_embeddings_statement(owned=True)
+
 class EmbeddingResponse(BaseModel):
     message: str
     processed: Optional[int] = None
@@ -25,11 +75,25 @@ class EmbeddingStatsResponse(BaseModel):
     embedding_model: str
     embedding_dimension: int
 
+class BatchEmbedRequest(BaseModel):
+    # Upper bound is the admin limit; the per-user limit is checked in the handler
+    texts: conlist(
+        constr(min_length=1, max_length=8000),
+        min_length=1,
+        max_length=settings.embed_batch_max_texts_admin
+    )
+
+class BatchEmbedResponse(BaseModel):
+    embeddings: List[Optional[List[float]]]  # None for texts too long to embed
+    dimension: int
+    model: str
+    latency_ms: float
+
 @router.post("/generate/{document_id}", response_model=EmbeddingResponse)
 async def generate_document_embeddings(
     document_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Generate embeddings for a specific document.
@@ -39,31 +103,34 @@ async def generate_document_embeddings(
     Admin users can generate embeddings for any document.
     Regular users can only process their own documents.
     """
-    from app.models import Document
-    
-    # Verify document exists and user has access
+    # Verify document exists and user has access, fetching its pending chunks
     if current_user.is_admin:
-        document = db.query(Document).filter(Document.id == document_id).first()
+        result = await db.execute(GET_DOCUMENT_PENDING_CHUNKS, {"document_id": document_id})
     else:
-        document = db.query(Document).filter(
-            Document.id == document_id,
-            Document.owner_id == current_user.id
-        ).first()
+        result = await db.execute(
+            GET_OWNED_DOCUMENT_PENDING_CHUNKS,
+            {"document_id": document_id, "owner_id": current_user.id}
+        )
+    rows = result.all()
     
-    if not document:
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Document not found"
         )
     
+    document = rows[0]
     if document.status != "completed":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Document must be processed before generating embeddings"
         )
     
+    # The outer join yields a single all-NULL chunk row when nothing is pending
+    chunks = [row for row in rows if row.id is not None]
+    
     # Generate embeddings
-    success = await embedding_service.embed_document_chunks(document_id, db)
+    success = await embedding_service.embed_chunks(document_id, chunks, db)
     
     if success:
         return EmbeddingResponse(
@@ -77,8 +144,8 @@ async def generate_document_embeddings(
 
 @router.post("/generate-all", response_model=EmbeddingResponse)
 async def generate_all_embeddings(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Generate embeddings for all documents that don't have them yet.
@@ -103,10 +170,49 @@ async def generate_all_embeddings(
         details=results.get("details", [])
     )
 
+@router.post("/batch", response_model=BatchEmbedResponse)
+async def batch_embed(
+    request: BatchEmbedRequest,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """
+    Embed a batch of raw texts.
+    
+    - **texts**: Non-empty strings of at most 8000 characters each
+    
+    Regular users may send up to EMBED_BATCH_MAX_TEXTS texts per request,
+    admins up to EMBED_BATCH_MAX_TEXTS_ADMIN. Texts are sent to OpenAI in
+    concurrent batches of the service's batch_size so large requests stay
+    under the API's per-request limits. Embeddings are returned in input
+    order (null for a text too long for the model) and nothing is stored.
+    """
+    max_texts = settings.embed_batch_max_texts_admin if current_user.is_admin else settings.embed_batch_max_texts
+    if len(request.texts) > max_texts:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {max_texts} texts can be embedded per request"
+        )
+    
+    started = time.perf_counter()
+    try:
+        embeddings = await embedding_service.embed_texts(request.texts)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to generate embeddings"
+        )
+    
+    return BatchEmbedResponse(
+        embeddings=[None if is_skipped(embedding) else embedding.tolist() for embedding in embeddings],
+        dimension=embedding_service.embedding_dimension,
+        model=embedding_service.model,
+        latency_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
+
 @router.get("/stats", response_model=EmbeddingStatsResponse)
 async def get_embedding_statistics(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get statistics about embeddings in the database.
@@ -114,15 +220,15 @@ async def get_embedding_statistics(
     Shows coverage, model used, and processing status.
     """
     
-    stats = embedding_service.get_embedding_stats(db)
+    stats = await embedding_service.get_embedding_stats(db)
     
     return EmbeddingStatsResponse(**stats)
 
 @router.delete("/reset/{document_id}")
 async def reset_document_embeddings(
     document_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Remove all embeddings for a specific document.
@@ -130,30 +236,26 @@ async def reset_document_embeddings(
     Useful for re-generating embeddings with different models or parameters.
     Admin users can reset any document, regular users only their own.
     """
-    from app.models import Document, DocumentChunk
-    
-    # Verify document exists and user has access
+    # Access check, reset and count in one statement; no row means the
+    # document doesn't exist or isn't visible to this user
     if current_user.is_admin:
-        document = db.query(Document).filter(Document.id == document_id).first()
+        result = await db.execute(RESET_DOCUMENT_EMBEDDINGS, {"b_document_id": document_id})
     else:
-        document = db.query(Document).filter(
-            Document.id == document_id,
-            Document.owner_id == current_user.id
-        ).first()
+        result = await db.execute(
+            RESET_OWNED_DOCUMENT_EMBEDDINGS,
+            {"b_document_id": document_id, "b_owner_id": current_user.id}
+        )
+    row = result.one_or_none()
     
-    if not document:
+    if row is None:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Document not found"
         )
     
-    # Reset embeddings to None
-    chunks_updated = db.query(DocumentChunk).filter(
-        DocumentChunk.document_id == document_id
-    ).update({"embedding": None})
-    
-    db.commit()
+    await db.commit()
     
     return {
-        "message": f"Reset embeddings for {chunks_updated} chunks in document: {document.original_filename}"
+        "message": f"Reset embeddings for {row.chunks_updated} chunks in document: {row.original_filename}"
     }
\ No newline at end of file
@@ -1,26 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.auth import UserCreate, UserLogin, Token, UserResponse, authenticate_user, create_user, get_current_user
+from app.auth import UserCreate, UserLogin, Token, UserResponse, authenticate_user, create_user, get_current_user, CurrentUser
 from app.utils.security import create_access_token
 
 # Create router for user-related endpoints
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 @router.post("/signup", response_model=Token)
-async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new user account.
     
     - **email**: Valid email address (must be unique)
-    - **password**: User password (will be hashed)
+    - **password**: User password, 8-128 characters (will be hashed)
     - **full_name**: Optional user's full name
     
     Returns JWT token for immediate login.
+    Use the returned token directly; do not call /login after /signup -
+    that would repeat the password hashing work for no benefit.
     """
     try:
         # Create user (this will raise HTTPException if email exists)
-        user = create_user(db, user_data)
+        user = await create_user(db, user_data)
         
         # Create access token for the new user
         access_token = create_access_token(data={"sub": user.email})
@@ -41,7 +43,7 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """
     Authenticate user and return JWT token.
     
@@ -51,7 +53,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     Returns JWT token for accessing protected endpoints.
     """
     # Authenticate user
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+    user = await authenticate_user(db, user_credentials.email, user_credentials.password)
     
     if not user:
         raise HTTPException(
@@ -69,7 +71,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     }
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user = Depends(get_current_user)):
+async def get_current_user_info(current_user: CurrentUser = Depends(get_current_user)):
     """
     Get current user's profile information.
     
@@ -79,7 +81,7 @@ async def get_current_user_info(current_user = Depends(get_current_user)):
     return current_user
 
 @router.get("/protected")
-async def protected_route(current_user = Depends(get_current_user)):
+async def protected_route(current_user: CurrentUser = Depends(get_current_user)):
     """
     Example protected route that requires authentication.
     
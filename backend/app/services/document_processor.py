@@ -1,14 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
 from typing import List
 
+from app.database import SessionLocal
 from app.models import Document, DocumentChunk
-from app.services.pdf_processing import process_pdf_file
+from app.services.pdf_processing import process_pdf_file_async
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def process_uploaded_document(document_id: int, db: Session) -> bool:
+async def process_uploaded_document(document_id: int, db: AsyncSession) -> bool:
     """
     Process an uploaded document: extract text, chunk it, and store in database.
     
@@ -21,7 +23,7 @@ async def process_uploaded_document(document_id: int, db: Session) -> bool:
     """
     
     # Get document from database
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     
     if document.status != "uploaded":
         if document.status == "completed":
@@ -35,55 +37,75 @@ async def process_uploaded_document(document_id: int, db: Session) -> bool:
             return False
 
     
+    # Claim the document atomically so a rescheduled retry and the original
+    # task can't both process it
+    result = await db.execute(
+        update(Document)
+        .where(Document.id == document_id, Document.status == "uploaded")
+        .values(status="processing")
+    )
+    await db.commit()
+    if not result.rowcount:
+        logger.warning(f"Document {document_id} was claimed by another task")
+        return False
+    
     try:
-        # Update status to processing
-        document.status = "processing"
-        db.commit()
-        
         # Process the PDF file
         file_path = Path(document.upload_path)
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
         
         logger.info(f"Processing PDF: {file_path}")
-        chunks = process_pdf_file(file_path)
+        chunks = await process_pdf_file_async(file_path)
         
         if not chunks:
             raise ValueError("No text chunks extracted from PDF")
         
-        # Store chunks in database
-        db_chunks = []
-        for chunk_data in chunks:
-            db_chunk = DocumentChunk(
-                document_id=document.id,
-                chunk_text=chunk_data.text,
-                chunk_index=chunk_data.chunk_index,
-                page_number=chunk_data.page_number,
-                # embedding will be generated later
-                embedding=None
-            )
-            db_chunks.append(db_chunk)
-        
-        # Batch insert all chunks
-        db.add_all(db_chunks)
+        # Store chunks in database with one bulk INSERT instead of an ORM
+        # object per chunk; embeddings are generated later
+        await db.execute(
+            insert(DocumentChunk),
+            [
+                {
+                    "document_id": document.id,
+                    "chunk_text": chunk_data.text,
+                    "chunk_index": chunk_data.chunk_index,
+                    "page_number": chunk_data.page_number,
+                }
+                for chunk_data in chunks
+            ],
+        )
         
         # Update document status to completed
         document.status = "completed"
-        db.commit()
+        await db.commit()
         
         logger.info(f"Successfully processed document {document_id}: {len(chunks)} chunks created")
         return True
         
     except Exception as e:
         # Rollback changes and mark as failed
-        db.rollback()
+        await db.rollback()
         document.status = "failed"
-        db.commit()
+        await db.commit()
         
         logger.error(f"Failed to process document {document_id}: {str(e)}")
         return False
 
-def get_document_chunks(document_id: int, db: Session) -> List[DocumentChunk]:
+async def process_document_in_background(document_id: int) -> None:
+    """
+    Process an uploaded document in its own database session.
+    
+    Meant to be scheduled as a FastAPI background task: the request's
+    session is closed once the response is sent, so it can't be reused here.
+    
+    Args:
+        document_id: ID of the document to process
+    """
+    async with SessionLocal() as db:
+        await process_uploaded_document(document_id, db)
+
+async def get_document_chunks(document_id: int, db: AsyncSession) -> List[DocumentChunk]:
     """
     Get all chunks for a document.
     
@@ -94,11 +116,14 @@ def get_document_chunks(document_id: int, db: Session) -> List[DocumentChunk]:
     Returns:
         List of DocumentChunk objects
     """
-    return db.query(DocumentChunk).filter(
-        DocumentChunk.document_id == document_id
-    ).order_by(DocumentChunk.chunk_index).all()
+    result = await db.execute(
+        select(DocumentChunk)
+        .where(DocumentChunk.document_id == document_id)
+        .order_by(DocumentChunk.chunk_index)
+    )
+    return result.scalars().all()
 
-def get_document_stats(document_id: int, db: Session) -> dict:
+async def get_document_stats(document_id: int, db: AsyncSession) -> dict:
     """
     Get statistics about a processed document.
     
@@ -109,30 +134,40 @@ def get_document_stats(document_id: int, db: Session) -> dict:
     Returns:
         Dictionary with document statistics
     """
-    document = db.query(Document).filter(Document.id == document_id).first()
-    if not document:
+    # Document fields and chunk aggregates in one query; chunk text never
+    # leaves the database
+    result = await db.execute(
+        select(
+            Document.status,
+            Document.original_filename,
+            func.count(DocumentChunk.id).label("total_chunks"),
+            func.coalesce(func.sum(func.length(DocumentChunk.chunk_text)), 0).label("total_characters"),
+            func.max(DocumentChunk.page_number).label("pages"),
+        )
+        .select_from(Document)
+        .outerjoin(DocumentChunk, DocumentChunk.document_id == Document.id)
+        .where(Document.id == document_id)
+        .group_by(Document.id)
+    )
+    row = result.one_or_none()
+    if row is None:
         return {}
     
-    chunks = get_document_chunks(document_id, db)
-    
-    if not chunks:
+    if not row.total_chunks:
         return {
             "document_id": document_id,
-            "status": document.status,
+            "status": row.status,
             "total_chunks": 0,
             "total_characters": 0,
             "pages": 0
         }
     
-    total_chars = sum(len(chunk.chunk_text) for chunk in chunks)
-    max_page = max(chunk.page_number for chunk in chunks if chunk.page_number)
-    
     return {
         "document_id": document_id,
-        "filename": document.original_filename,
-        "status": document.status,
-        "total_chunks": len(chunks),
-        "total_characters": total_chars,
-        "pages": max_page,
-        "avg_chunk_size": total_chars // len(chunks) if chunks else 0
-    }
\ No newline at end of file
+        "filename": row.original_filename,
+        "status": row.status,
+        "total_chunks": row.total_chunks,
+        "total_characters": row.total_characters,
+        "pages": row.pages or 0,
+        "avg_chunk_size": row.total_characters // row.total_chunks
+    }
@@ -1,60 +1,242 @@
+import base64
+import numpy as np
 import openai
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+from typing import List, NamedTuple
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.models import Document, DocumentChunk
 import logging
 import asyncio
+from itertools import groupby
+from operator import attrgetter
 
 logger = logging.getLogger(__name__)
 
+# Transient OpenAI failures worth retrying (APITimeoutError is an APIConnectionError)
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+# Longest server-requested delay we honour before falling back to backoff
+MAX_RETRY_AFTER = 60.0
+
+_backoff = wait_random_exponential(min=1, max=30)
+
+def _wait_for_retry(retry_state) -> float:
+    """
+    Seconds to wait before the next attempt.
+    
+    Uses the server's Retry-After (or retry-after-ms) header when present,
+    otherwise full-jitter exponential backoff.
+    """
+    error = retry_state.outcome.exception()
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            if "retry-after-ms" in response.headers:
+                delay = float(response.headers["retry-after-ms"]) / 1000
+            else:
+                delay = float(response.headers["retry-after"])
+            if 0 <= delay <= MAX_RETRY_AFTER:
+                return delay
+        except (KeyError, ValueError):
+            pass  # Missing or HTTP-date form; use backoff
+    return _backoff(retry_state)
+
+def _is_context_length_error(error: Exception) -> bool:
+    """Whether a 400 was caused by an input exceeding the model's context"""
+    return getattr(error, "code", None) == "context_length_exceeded" or "maximum context length" in str(error)
+
+def is_skipped(embedding: np.ndarray) -> bool:
+    """Whether an embedding row is the NaN marker for a text that couldn't be embedded"""
+    return bool(np.isnan(embedding[0]))
+
+def _embedded_rows(rows, embeddings):
+    """Pair rows with their embeddings, leaving out skipped texts"""
+    return ((row, embedding) for row, embedding in zip(rows, embeddings) if not is_skipped(embedding))
+
+class _Text(NamedTuple):
+    """Free text shaped like a chunk row so it can go through _make_batches"""
+    id: int  # Position in the caller's list
+    chunk_text: str
+
 class EmbeddingService:
     """Service for generating and managing document embeddings"""
     
-    def __init__(self, model: str = "text-embedding-3-small", batch_size: int = 100):
+    def __init__(self, model: str = "text-embedding-3-small", batch_size: int = 100, max_concurrency: int = 8):
         """
         Initialize embedding service.
         
         Args:
             model: OpenAI embedding model to use
             batch_size: Number of texts to process in one API call
+            max_concurrency: Maximum number of API calls in flight per document
         """
-        self.client = openai.OpenAI(api_key=settings.openai_api_key)
+        # Retries are handled by tenacity in _create_embeddings so Retry-After
+        # is honoured and attempts aren't multiplied by the client's own retries
+        self.client = openai.AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0, timeout=30.0)
         self.model = model
         self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
         self.embedding_dimension = 1536  # text-embedding-3-small dimension
     
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    @retry(
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        wait=_wait_for_retry,
+        stop=stop_after_attempt(6),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True,
+    )
+    async def _create_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Make one embeddings API call, retrying transient failures.
+        
+        Embeddings are requested base64-encoded and decoded straight into one
+        contiguous float32 array, so no per-element Python floats are built.
+        """
+        # OpenAI API call (non-blocking, frees the event loop during network I/O)
+        response = await self.client.embeddings.create(
+            input=texts,
+            model=self.model,
+            encoding_format="base64"
+        )
+        
+        # Decode each base64 float32 payload into its row of the result
+        embeddings = np.empty((len(response.data), self.embedding_dimension), dtype=np.float32)
+        for item in response.data:
+            embeddings[item.index] = np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+        return embeddings
+    
+    async def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts, bisecting the batch when it exceeds the model's context.
+        
+        A text that is too long even on its own gets a NaN row (see
+        is_skipped) instead of failing the call, so the rest of the batch is
+        still embedded and kept.
+        """
+        try:
+            return await self._create_embeddings(texts)
+        except openai.BadRequestError as e:
+            if not _is_context_length_error(e):
+                raise
+            if len(texts) == 1:
+                logger.warning(f"Skipping text of {len(texts[0])} characters: exceeds the model's context length")
+                return np.full((1, self.embedding_dimension), np.nan, dtype=np.float32)
+            middle = len(texts) // 2
+            logger.warning(f"Batch of {len(texts)} texts exceeds context length, splitting")
+            return np.concatenate([
+                await self._embed_texts(texts[:middle]),
+                await self._embed_texts(texts[middle:])
+            ])
+    
+    async def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for a list of texts using OpenAI API.
         
+        Identical texts are embedded once and shared. Transient API errors
+        (rate limits, connection errors, 5xx) are retried with backoff.
+        
         Args:
             texts: List of text strings to embed
             
         Returns:
-            List of embedding vectors (each is list of floats)
+            float32 array of shape (len(texts), embedding_dimension), one row
+            per input text in input order. Rows for texts longer than the
+            model's context are NaN; check them with is_skipped.
         """
         if not texts:
-            return []
+            return np.empty((0, self.embedding_dimension), dtype=np.float32)
+        
+        # Coalesce duplicates (repeated headers, footers, boilerplate pages)
+        positions = {}
+        unique_texts = []
+        for text in texts:
+            if text not in positions:
+                positions[text] = len(unique_texts)
+                unique_texts.append(text)
         
         try:
-            # OpenAI API call (synchronous in async wrapper)
-            response = self.client.embeddings.create(
-                input=texts,
-                model=self.model
-            )
-            
-            # Extract embeddings from response
-            embeddings = [item.embedding for item in response.data]
-            
-            logger.info(f"Generated {len(embeddings)} embeddings using {self.model}")
-            return embeddings
-            
+            embeddings = await self._embed_texts(unique_texts)
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {str(e)}")
             raise Exception(f"OpenAI API error: {str(e)}")
+        
+        if len(unique_texts) < len(texts):
+            embeddings = embeddings[[positions[text] for text in texts]]
+        
+        logger.info(f"Generated {len(embeddings)} embeddings using {self.model}")
+        return embeddings
     
-    async def embed_document_chunks(self, document_id: int, db: Session) -> bool:
+    def _make_batches(self, chunks: list) -> List[list]:
+        """
+        Split chunk rows into API-sized batches of similar-length texts.
+        
+        Args:
+            chunks: Rows exposing .id and .chunk_text
+            
+        Returns:
+            List of batches, each at most batch_size rows
+        """
+        # Batch similar-length texts together so requests are evenly sized
+        chunks = sorted(chunks, key=lambda chunk: len(chunk.chunk_text))
+        return [chunks[i:i + self.batch_size] for i in range(0, len(chunks), self.batch_size)]
+    
+    async def _embed_batches(self, batches: List[list], return_exceptions: bool = False) -> list:
+        """
+        Embed batches concurrently, with at most max_concurrency calls in flight.
+        
+        Args:
+            batches: Batches from _make_batches
+            return_exceptions: Return failures in place instead of raising the first one
+            
+        Returns:
+            Embeddings (or exceptions) for each batch, in batch order
+        """
+        # Bounded concurrency replaces the fixed delay between batches;
+        # each call retries 429s with backoff in _create_embeddings
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def embed_batch(batch):
+            async with semaphore:
+                return await self.generate_embeddings([chunk.chunk_text for chunk in batch])
+        
+        # Only API calls run concurrently; the session is touched after they finish
+        return await asyncio.gather(
+            *(embed_batch(batch) for batch in batches),
+            return_exceptions=return_exceptions
+        )
+    
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed any number of free texts through the concurrent batch pipeline.
+        
+        Texts are split into batch_size API calls (so large requests stay
+        under the API's per-request limits) and reassembled in input order.
+        
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            float32 array with one row per input text in input order; rows
+            for texts too long to embed are NaN (see is_skipped)
+        """
+        batches = self._make_batches([_Text(index, text) for index, text in enumerate(texts)])
+        results = await self._embed_batches(batches)
+        
+        # Batches are sorted by length; scatter rows back to their positions
+        embeddings = np.empty((len(texts), self.embedding_dimension), dtype=np.float32)
+        for batch, batch_embeddings in zip(batches, results):
+            embeddings[[text.id for text in batch]] = batch_embeddings
+        return embeddings
+    
+    async def embed_document_chunks(self, document_id: int, db: AsyncSession) -> bool:
         """
         Generate embeddings for all chunks of a specific document.
         
@@ -67,95 +249,159 @@ class EmbeddingService:
         """
         try:
             # Get document and verify it exists
-            document = db.query(Document).filter(Document.id == document_id).first()
+            document = await db.get(Document, document_id)
             if not document:
                 logger.error(f"Document {document_id} not found")
                 return False
             
             # Get all chunks for this document that don't have embeddings yet
-            chunks = db.query(DocumentChunk).filter(
-                DocumentChunk.document_id == document_id,
-                DocumentChunk.embedding.is_(None)
-            ).all()
-            
-            if not chunks:
-                logger.info(f"Document {document_id} already has embeddings or no chunks")
-                return True
+            # Plain (id, text) rows: nothing for the session to track or dirty-check
+            result = await db.execute(
+                select(DocumentChunk.id, DocumentChunk.chunk_text).where(
+                    DocumentChunk.document_id == document_id,
+                    DocumentChunk.embedding.is_(None)
+                )
+            )
+            chunks = result.all()
+        except Exception as e:
+            logger.error(f"Failed to embed document {document_id}: {str(e)}")
+            await db.rollback()
+            return False
+        
+        return await self.embed_chunks(document_id, chunks, db)
+    
+    async def embed_chunks(self, document_id: int, chunks: list, db: AsyncSession) -> bool:
+        """
+        Generate and store embeddings for already-fetched chunks of a document.
+        
+        Lets callers that fetched the pending chunks themselves (e.g. together
+        with an access check) skip a second lookup.
+        
+        Args:
+            document_id: ID of the document the chunks belong to
+            chunks: Rows exposing .id and .chunk_text
+            db: Database session
             
+        Returns:
+            True if successful, False otherwise
+        """
+        if not chunks:
+            logger.info(f"Document {document_id} already has embeddings or no chunks")
+            return True
+        
+        try:
             logger.info(f"Processing {len(chunks)} chunks for document {document_id}")
             
-            # Process chunks in batches
-            for i in range(0, len(chunks), self.batch_size):
-                batch = chunks[i:i + self.batch_size]
-                texts = [chunk.chunk_text for chunk in batch]
-                
-                # Generate embeddings for this batch
-                embeddings = await self.generate_embeddings(texts)
-                
-                # Store embeddings in database
-                for chunk, embedding in zip(batch, embeddings):
-                    chunk.embedding = embedding
-                
-                # Commit this batch
-                db.commit()
-                
-                logger.info(f"Processed batch {i//self.batch_size + 1}/{(len(chunks)-1)//self.batch_size + 1}")
-                
-                # Rate limiting - avoid hitting OpenAI limits
-                if i + self.batch_size < len(chunks):
-                    await asyncio.sleep(0.5)  # Small delay between batches
+            batches = self._make_batches(chunks)
+            results = await self._embed_batches(batches)
+            
+            # Store embeddings with one executemany UPDATE keyed on primary key;
+            # skipped (oversized) chunks keep a NULL embedding
+            mappings = [
+                {"id": chunk.id, "embedding": embedding}
+                for batch, embeddings in zip(batches, results)
+                for chunk, embedding in _embedded_rows(batch, embeddings)
+            ]
+            if mappings:
+                await db.execute(update(DocumentChunk), mappings)
+            await db.commit()
+            
+            if len(mappings) < len(chunks):
+                logger.warning(f"Document {document_id}: {len(chunks) - len(mappings)} chunks too long to embed were skipped")
             
-            logger.info(f"Successfully embedded all chunks for document {document_id}")
+            logger.info(f"Successfully embedded all chunks for document {document_id} in {len(batches)} batches")
             return True
             
         except Exception as e:
             logger.error(f"Failed to embed document {document_id}: {str(e)}")
-            db.rollback()
+            await db.rollback()
             return False
     
-    async def embed_all_documents(self, db: Session) -> dict:
+    async def embed_all_documents(self, db: AsyncSession) -> dict:
         """
         Generate embeddings for all documents that don't have them yet.
         
+        All pending chunks are fetched in one query and embedded through a
+        single concurrent pipeline. Batches never span documents, so a failed
+        API call only fails the document it belongs to.
+        
         Args:
             db: Database session
             
         Returns:
             Dictionary with processing results
         """
-        # Get all documents with chunks but no embeddings
-        documents = db.query(Document).join(DocumentChunk).filter(
-            DocumentChunk.embedding.is_(None)
-        ).distinct().all()
+        # Get every chunk without an embedding, grouped by document
+        result = await db.execute(
+            select(DocumentChunk.id, DocumentChunk.chunk_text, DocumentChunk.document_id)
+            .where(DocumentChunk.embedding.is_(None))
+            .order_by(DocumentChunk.document_id, func.length(DocumentChunk.chunk_text))
+        )
+        chunks = result.all()
         
-        if not documents:
+        if not chunks:
             return {"message": "All documents already have embeddings", "processed": 0, "failed": 0}
         
-        results = {"processed": 0, "failed": 0, "details": []}
+        document_batches = {
+            document_id: self._make_batches(list(document_chunks))
+            for document_id, document_chunks in groupby(chunks, key=attrgetter("document_id"))
+        }
         
-        logger.info(f"Processing embeddings for {len(documents)} documents")
+        # Filenames for the response, in one IN query
+        result = await db.execute(
+            select(Document.id, Document.original_filename).where(Document.id.in_(document_batches))
+        )
+        filenames = dict(result.all())
         
-        for document in documents:
-            success = await self.embed_document_chunks(document.id, db)
-            
-            if success:
-                results["processed"] += 1
-                results["details"].append({
-                    "document_id": document.id,
-                    "filename": document.original_filename,
-                    "status": "success"
-                })
-            else:
-                results["failed"] += 1
-                results["details"].append({
-                    "document_id": document.id,
-                    "filename": document.original_filename,
-                    "status": "failed"
-                })
+        logger.info(f"Processing embeddings for {len(document_batches)} documents ({len(chunks)} chunks)")
+        
+        batch_owners = [
+            (document_id, batch)
+            for document_id, batches in document_batches.items()
+            for batch in batches
+        ]
+        batch_results = await self._embed_batches(
+            [batch for _, batch in batch_owners],
+            return_exceptions=True
+        )
+        
+        failed_documents = set()
+        for (document_id, _), batch_result in zip(batch_owners, batch_results):
+            if isinstance(batch_result, BaseException):
+                logger.error(f"Failed to embed document {document_id}: {str(batch_result)}")
+                failed_documents.add(document_id)
+        
+        # Store embeddings for every document whose batches all succeeded in one
+        # UPDATE; skipped (oversized) chunks keep a NULL embedding
+        mappings = [
+            {"id": chunk.id, "embedding": embedding}
+            for (document_id, batch), embeddings in zip(batch_owners, batch_results)
+            if document_id not in failed_documents
+            for chunk, embedding in _embedded_rows(batch, embeddings)
+        ]
+        try:
+            if mappings:
+                await db.execute(update(DocumentChunk), mappings)
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to store embeddings: {str(e)}")
+            await db.rollback()
+            failed_documents = set(document_batches)
+        
+        results = {"processed": 0, "failed": 0, "details": []}
+        
+        for document_id in document_batches:
+            success = document_id not in failed_documents
+            results["processed" if success else "failed"] += 1
+            results["details"].append({
+                "document_id": document_id,
+                "filename": filenames.get(document_id),
+                "status": "success" if success else "failed"
+            })
         
         return results
     
-    def get_embedding_stats(self, db: Session) -> dict:
+    async def get_embedding_stats(self, db: AsyncSession) -> dict:
         """
         Get statistics about embeddings in the database.
         
@@ -165,16 +411,21 @@ class EmbeddingService:
         Returns:
             Dictionary with embedding statistics
         """
-        total_chunks = db.query(DocumentChunk).count()
-        embedded_chunks = db.query(DocumentChunk).filter(
-            DocumentChunk.embedding.isnot(None)
-        ).count()
-        
-        documents_with_embeddings = db.query(Document).join(DocumentChunk).filter(
-            DocumentChunk.embedding.isnot(None)
-        ).distinct().count()
-        
-        total_documents = db.query(Document).join(DocumentChunk).distinct().count()
+        # All four counts in one statement; COUNT(column) skips NULLs
+        row = (await db.execute(
+            select(
+                func.count(DocumentChunk.id).label("total_chunks"),
+                func.count(DocumentChunk.embedding).label("embedded_chunks"),
+                func.count(func.distinct(
+                    case((DocumentChunk.embedding.isnot(None), DocumentChunk.document_id))
+                )).label("documents_with_embeddings"),
+                func.count(func.distinct(DocumentChunk.document_id)).label("total_documents"),
+            )
+        )).one()
+        total_chunks = row.total_chunks
+        embedded_chunks = row.embedded_chunks
+        documents_with_embeddings = row.documents_with_embeddings
+        total_documents = row.total_documents
         
         return {
             "total_chunks": total_chunks,
@@ -1,9 +1,77 @@
-import PyPDF2
-from typing import List, Tuple
+import pypdf
+import asyncio
+import bisect
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
 from pathlib import Path
 import re
 from dataclasses import dataclass
 
+# Compiled once at import; _clean_text runs for every extracted page
+_WS_RE = re.compile(r'\s+')
+_PUNCT_RE = re.compile(r'[^\w\s\.,!?;:()\-\'"]+')
+_SENTENCE_END_RE = re.compile(r'[.!?]\s')
+_QUOTE_TRANSLATE = str.maketrans({
+    '\u201c': '"', '\u201d': '"',
+    '\u2018': "'", '\u2019': "'",
+})
+
+# Pages handed to each worker task; larger ranges amortize re-opening the
+# PDF in the worker, smaller ones spread short documents across more cores
+PAGES_PER_TASK = 16
+
+# Worker processes for CPU-bound text extraction, created on first use.
+# "spawn" avoids forking a process that is running an event loop and threads.
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared extraction pool, creating it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+def shutdown_process_pool() -> None:
+    """Shut down the extraction pool (called on application shutdown)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+
+@contextmanager
+def _open_pdf(file_path) -> Iterator[pypdf.PdfReader]:
+    """
+    Open a PDF for reading through a read-only memory map.
+    
+    The kernel pages the file in on demand instead of it being copied into
+    a Python buffer; the reader must not be used after the block exits.
+    """
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield pypdf.PdfReader(mapped)
+
+def _count_pages(file_path: str) -> int:
+    """Return the number of pages in a PDF (runs in a worker process)"""
+    with _open_pdf(file_path) as pdf_reader:
+        return len(pdf_reader.pages)
+
+def _extract_pages(file_path: str, start: int, stop: int) -> List[Tuple[str, int]]:
+    """
+    Extract and clean text for pages [start, stop) (runs in a worker process).
+    
+    Returns:
+        List of (text, page_number) tuples for non-empty pages
+    """
+    pages_text = []
+    with _open_pdf(file_path) as pdf_reader:
+        for page_idx in range(start, stop):
+            text = PDFProcessor._clean_text(pdf_reader.pages[page_idx].extract_text() or "")
+            if text.strip():  # Only add non-empty pages
+                pages_text.append((text, page_idx + 1))
+    return pages_text
+
 @dataclass
 class DocumentChunk:
     """Represents a chunk of text from a document"""
@@ -39,11 +107,9 @@ class PDFProcessor:
         pages_text = []
         
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
+            with _open_pdf(file_path) as pdf_reader:
                 for page_num, page in enumerate(pdf_reader.pages, 1):
-                    text = page.extract_text()
+                    text = page.extract_text() or ""
                     
                     # Clean up the extracted text
                     text = self._clean_text(text)
@@ -56,7 +122,36 @@ class PDFProcessor:
         
         return pages_text
     
-    def _clean_text(self, text: str) -> str:
+    async def extract_text_from_pdf_async(self, file_path: Path) -> List[Tuple[str, int]]:
+        """
+        Extract text from PDF file, spreading pages across the process pool.
+        
+        Keeps the CPU-heavy parsing off the event loop and uses all cores
+        for large documents.
+        
+        Args:
+            file_path: Path to the PDF file
+            
+        Returns:
+            List of (text, page_number) tuples, in page order
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        path = str(file_path)
+        
+        try:
+            page_count = await loop.run_in_executor(pool, _count_pages, path)
+            page_ranges = await asyncio.gather(*(
+                loop.run_in_executor(pool, _extract_pages, path, start, min(start + PAGES_PER_TASK, page_count))
+                for start in range(0, page_count, PAGES_PER_TASK)
+            ))
+        except Exception as e:
+            raise ValueError(f"Error reading PDF file: {str(e)}")
+        
+        return [page for page_range in page_ranges for page in page_range]
+    
+    @staticmethod
+    def _clean_text(text: str) -> str:
         """
         Clean extracted PDF text.
         
@@ -67,14 +162,13 @@ class PDFProcessor:
             Cleaned text
         """
         # Remove excessive whitespace and normalize line breaks
-        text = re.sub(r'\s+', ' ', text)
+        text = _WS_RE.sub(' ', text)
         
-        # Remove common PDF artifacts
-        text = re.sub(r'[^\w\s\.,!?;:()\-\'"]+', ' ', text)
+        # Normalize quotes (before artifact removal, which would strip them)
+        text = text.translate(_QUOTE_TRANSLATE)
         
-        # Normalize quotes
-        text = text.replace('"', '"').replace('"', '"')
-        text = text.replace(''', "'").replace(''', "'")
+        # Remove common PDF artifacts
+        text = _PUNCT_RE.sub(' ', text)
         
         return text.strip()
     
@@ -131,6 +225,10 @@ class PDFProcessor:
         chunks = []
         start = 0
         
+        # Offsets of sentence-ending punctuation, found once per page and
+        # binary-searched per chunk instead of rescanning each window
+        sentence_ends = [m.start() for m in _SENTENCE_END_RE.finditer(text)]
+        
         while start < len(text):
             # Calculate end position for this chunk
             end = start + self.chunk_size
@@ -139,10 +237,10 @@ class PDFProcessor:
             if end < len(text):
                 # Look for sentence endings within the last 200 characters
                 search_start = max(end - 200, start)
-                sentence_end = text.rfind('.', search_start, end)
+                i = bisect.bisect_left(sentence_ends, end) - 1
                 
-                if sentence_end > start:
-                    end = sentence_end + 1
+                if i >= 0 and sentence_ends[i] >= search_start and sentence_ends[i] > start:
+                    end = sentence_ends[i] + 1
             
             chunk = text[start:end].strip()
             if chunk:
@@ -177,6 +275,23 @@ class PDFProcessor:
         chunks = self.chunk_text(pages_text)
         
         return chunks
+    
+    async def process_pdf_async(self, file_path: Path) -> List[DocumentChunk]:
+        """
+        Complete PDF processing pipeline, with extraction in the process pool.
+        
+        Args:
+            file_path: Path to PDF file
+            
+        Returns:
+            List of processed document chunks
+        """
+        pages_text = await self.extract_text_from_pdf_async(file_path)
+        
+        if not pages_text:
+            raise ValueError("No text could be extracted from the PDF")
+        
+        return self.chunk_text(pages_text)
 
 # Utility function for easy usage
 def process_pdf_file(file_path: Path, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[DocumentChunk]:
@@ -192,4 +307,19 @@ def process_pdf_file(file_path: Path, chunk_size: int = 1000, chunk_overlap: int
         List of DocumentChunk objects
     """
     processor = PDFProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    return processor.process_pdf(file_path)
\ No newline at end of file
+    return processor.process_pdf(file_path)
+
+async def process_pdf_file_async(file_path: Path, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[DocumentChunk]:
+    """
+    Process a PDF file and return chunks without blocking the event loop.
+    
+    Args:
+        file_path: Path to PDF file
+        chunk_size: Size of each chunk in characters
+        chunk_overlap: Overlap between chunks in characters
+        
+    Returns:
+        List of DocumentChunk objects
+    """
+    processor = PDFProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return await processor.process_pdf_async(file_path)
\ No newline at end of file
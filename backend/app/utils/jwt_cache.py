@@ -0,0 +1,55 @@
+import hashlib
+import threading
+import time
+from typing import Any, Optional
+from cachetools import TTLCache
+
+# Short-lived cache of successfully verified tokens.
+# Keys are SHA-256 digests so raw tokens are never held in memory.
+TOKEN_CACHE_TTL = 5  # seconds
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL)
+_lock = threading.Lock()
+
+def _token_key(token: str) -> bytes:
+    """Hash a raw token into its cache key"""
+    return hashlib.sha256(token.encode()).digest()
+
+def get_cached_token(token: str) -> Optional[Any]:
+    """
+    Look up the value cached for a verified token.
+
+    Args:
+        token: Raw JWT token string
+
+    Returns:
+        Cached value, or None if missing or the token has since expired
+    """
+    key = _token_key(token)
+    with _lock:
+        entry = _token_cache.get(key)
+
+    if entry is None:
+        return None
+
+    value, expires_at = entry
+    if expires_at <= time.time():
+        return None
+    return value
+
+def cache_token(token: str, value: Any, expires_at: float) -> None:
+    """
+    Cache the result of a successful token verification.
+
+    Only call this after the token has been fully verified - failed
+    validations must never be cached.
+
+    Args:
+        token: Raw JWT token string
+        value: Value to return on later hits
+        expires_at: Token expiry as a Unix timestamp; entries are never
+            served past min(expires_at, now + TOKEN_CACHE_TTL)
+    """
+    key = _token_key(token)
+    expires_at = min(expires_at, time.time() + TOKEN_CACHE_TTL)
+    with _lock:
+        _token_cache[key] = (value, expires_at)
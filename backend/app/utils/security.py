@@ -1,16 +1,37 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.config import settings
+from app.utils.jwt_cache import get_cached_token, cache_token
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use argon2id (OWASP baseline: 19 MiB, 2 passes, 1 lane), which
+# is faster than bcrypt at comparable strength. bcrypt stays as a deprecated
+# scheme so existing hashes still verify and are upgraded on next login.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+    bcrypt__rounds=settings.bcrypt_rounds,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a plain password and rehash it if its hash is outdated.
+    
+    Returns:
+        (valid, new_hash) - new_hash is set only when the stored hash uses a
+        deprecated scheme or cost and should be replaced
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """Hash a plain password"""
     return pwd_context.hash(password)
@@ -37,21 +58,47 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
+def decode_token(token: str) -> Optional[dict]:
     """
-    Verify JWT token and extract user email.
+    Verify JWT token and return its payload.
     
     Args:
         token: JWT token string
         
     Returns:
-        User email if token is valid, None otherwise
+        Decoded payload if token is valid and has a subject, None otherwise
     """
     try:
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        email: str = payload.get("sub")
-        if email is None:
+        if payload.get("sub") is None:
             return None
-        return email
+        return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+def verify_token(token: str) -> Optional[str]:
+    """
+    Verify JWT token and extract user email.
+    
+    Successful verifications are cached briefly (keyed by a hash of the
+    token) so repeated requests with the same token skip signature checks.
+    Failed verifications are never cached.
+    
+    Args:
+        token: JWT token string
+        
+    Returns:
+        User email if token is valid, None otherwise
+    """
+    email = get_cached_token(token)
+    if email is not None:
+        return email
+    
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    
+    email = payload["sub"]
+    if payload.get("exp") is not None:
+        cache_token(token, email, payload["exp"])
+    return email
@@ -0,0 +1,45 @@
+import threading
+from typing import Any, Optional
+from cachetools import TTLCache
+
+# Short-lived cache of user lookups by email, so authenticated requests
+# don't need a users SELECT each time.
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+_lock = threading.Lock()
+
+def get_cached_user(email: str) -> Optional[Any]:
+    """
+    Look up the user cached for an email.
+
+    Args:
+        email: User email
+
+    Returns:
+        Cached user, or None if missing or expired
+    """
+    with _lock:
+        return _user_cache.get(email)
+
+def cache_user(email: str, user: Any) -> None:
+    """
+    Cache a user looked up from the database.
+
+    Args:
+        email: User email
+        user: Detached user snapshot to return on later hits
+    """
+    with _lock:
+        _user_cache[email] = user
+
+def invalidate_user(email: str) -> None:
+    """
+    Drop a cached user.
+
+    Any code path that changes a user's profile, active status or admin
+    flag must call this so the change is visible on the next request.
+
+    Args:
+        email: User email
+    """
+    with _lock:
+        _user_cache.pop(email, None)
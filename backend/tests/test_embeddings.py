@@ -0,0 +1,102 @@
+import asyncio
+import base64
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import openai
+import pytest
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.routers.embeddings import RESET_DOCUMENT_EMBEDDINGS, RESET_OWNED_DOCUMENT_EMBEDDINGS
+from app.services.embeddings import EmbeddingService, is_skipped
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+TOO_LONG = "too long"
+
+class StubEmbeddings:
+    """Stands in for client.embeddings: raises queued errors, then embeds"""
+    
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = []
+    
+    async def create(self, input, model, encoding_format):
+        self.calls.append(list(input))
+        if self.errors:
+            raise self.errors.pop(0)
+        if TOO_LONG in input:
+            raise openai.BadRequestError(
+                "This model's maximum context length is 8192 tokens",
+                response=httpx.Response(400, request=REQUEST),
+                body={"code": "context_length_exceeded"}
+            )
+        # Each vector is filled with the first character's code point
+        data = [
+            SimpleNamespace(
+                index=i,
+                embedding=base64.b64encode(np.full(1536, ord(text[0]), dtype=np.float32).tobytes()).decode()
+            )
+            for i, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=data)
+
+def make_service(errors=()):
+    service = EmbeddingService()
+    stub = StubEmbeddings(errors)
+    service.client = SimpleNamespace(embeddings=stub)
+    return service, stub
+
+def test_retries_transient_errors_honouring_retry_after():
+    service, stub = make_service([
+        openai.RateLimitError("slow down", response=httpx.Response(429, headers={"retry-after": "0.01"}, request=REQUEST), body=None),
+        openai.InternalServerError("boom", response=httpx.Response(500, headers={"retry-after-ms": "10"}, request=REQUEST), body=None),
+    ])
+    embeddings = asyncio.run(service.generate_embeddings(["a", "b"]))
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (2, 1536)
+    assert embeddings[:, 0].tolist() == [ord("a"), ord("b")]
+    assert len(stub.calls) == 3
+
+def test_does_not_retry_authentication_errors():
+    service, stub = make_service([
+        openai.AuthenticationError("bad key", response=httpx.Response(401, request=REQUEST), body=None),
+    ])
+    with pytest.raises(Exception, match="bad key"):
+        asyncio.run(service.generate_embeddings(["a"]))
+    assert len(stub.calls) == 1
+
+def test_oversized_text_is_skipped_and_rest_of_batch_kept():
+    service, stub = make_service()
+    embeddings = asyncio.run(service.generate_embeddings(["a", "b", TOO_LONG, "c"]))
+    assert [is_skipped(row) for row in embeddings] == [False, False, True, False]
+    assert embeddings[[0, 1, 3], 0].tolist() == [ord("a"), ord("b"), ord("c")]
+    # Full batch, then halves, then the bad half's singles
+    assert stub.calls == [["a", "b", TOO_LONG, "c"], ["a", "b"], [TOO_LONG, "c"], [TOO_LONG], ["c"]]
+
+def test_duplicate_texts_are_embedded_once():
+    service, stub = make_service()
+    embeddings = asyncio.run(service.generate_embeddings(["a", "b", "a"]))
+    assert stub.calls == [["a", "b"]]
+    assert embeddings[:, 0].tolist() == [ord("a"), ord("b"), ord("a")]
+
+def test_embed_texts_batches_and_keeps_input_order():
+    service, stub = make_service()
+    service.batch_size = 2
+    texts = ["dddd", "a", TOO_LONG, "ccc", "bb"]
+    embeddings = asyncio.run(service.embed_texts(texts))
+    assert all(len(call) <= 2 for call in stub.calls)
+    assert [is_skipped(row) for row in embeddings] == [False, False, True, False, False]
+    assert embeddings[[0, 1, 3, 4], 0].tolist() == [ord("d"), ord("a"), ord("c"), ord("b")]
+
+@pytest.mark.parametrize("statement, params", [
+    (RESET_DOCUMENT_EMBEDDINGS, {"b_document_id": 1}),
+    (RESET_OWNED_DOCUMENT_EMBEDDINGS, {"b_document_id": 1, "b_owner_id": 2}),
+])
+def test_reset_statements_compile_with_their_parameters(statement, params):
+    # column_keys mirrors execution: it is how SQLAlchemy builds the UPDATE's
+    # SET clause, and where bind names clashing with columns are rejected
+    compiled = statement.compile(dialect=asyncpg.dialect(), column_keys=list(params))
+    assert "UPDATE document_chunks" in str(compiled)
+    assert compiled.construct_params(params).items() >= params.items()
+
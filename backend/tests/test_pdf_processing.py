@@ -0,0 +1,31 @@
+from app.services.pdf_processing import PDFProcessor
+
+processor = PDFProcessor(chunk_size=100, chunk_overlap=20)
+
+def test_split_breaks_at_sentence_end():
+    text = ("This is a sentence. " * 20).strip()
+    chunks = processor._split_text_with_overlap(text, 1)
+    assert len(chunks) > 1
+    for chunk in chunks[:-1]:
+        assert chunk.endswith(".")
+        assert len(chunk) <= 100
+
+def test_split_without_sentence_end_uses_chunk_size():
+    text = "x" * 250
+    chunks = processor._split_text_with_overlap(text, 1)
+    assert [len(chunk) for chunk in chunks] == [100, 100, 90, 10]
+
+def test_split_ignores_punctuation_without_following_space():
+    text = "a" * 90 + "3.14" + "b" * 100
+    chunks = processor._split_text_with_overlap(text, 1)
+    assert len(chunks[0]) == 100
+
+def test_chunk_text_keeps_small_pages_whole():
+    chunks = processor.chunk_text([("Short page.", 1), ("Another one.", 2)])
+    assert [(c.text, c.chunk_index, c.page_number) for c in chunks] == [
+        ("Short page.", 0, 1),
+        ("Another one.", 1, 2),
+    ]
+
+def test_clean_text_normalizes_quotes_and_whitespace():
+    assert processor._clean_text("“Hi”  it’s\n\nok") == "\"Hi\" it's ok"